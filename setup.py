@@ -18,7 +18,6 @@ setup(
         "click>=8.0.0,<8.2",
         "blessings~=1.7",
         "attrs>=21.4.0,<22.2",
-        "sortedcontainers~=2.4.0",
         "aiohttp~=3.8.0",
         "pytest>=7.0.0,<7.3",
         "pyyaml~=6.0",
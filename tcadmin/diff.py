@@ -7,37 +7,117 @@
 import re
 import click
 import blessings
-import attr
-import subprocess
-from collections import defaultdict
-from tempfile import NamedTemporaryFile
+import bisect
+import difflib
+import functools
 
 from .util.ansi import strip_ansi
 from .resources import Resources
+from .resources.resources import attribute_names
 from .options import with_options, diff_options
 
 t = blessings.Terminal()
 
+CONTEXT_RE = re.compile(r"^@@ -([0-9]*),")
+LABEL_RE = re.compile(r"^  ([^ ].*)")  # lines with exactly two spaces indentation
 
-def fast_diff(left, right, n):
-    with NamedTemporaryFile("w") as left_file, NamedTemporaryFile("w") as right_file:
-        left_file.write("\n".join(left))
-        right_file.write("\n".join(right))
-        output = subprocess.run(
-            [
-                "diff",
-                f"-U{n}",
-                "--label",
-                "current",
-                "--label",
-                "generated",
-                left_file.name,
-                right_file.name,
-            ],
-            encoding="utf8",
-            stdout=subprocess.PIPE,
-        ).stdout
-        return output.split("\n")
+
+def resource_opcodes(left, left_segments, right, right_segments):
+    """
+    Compute difflib-style opcodes transforming the rendered lines of current
+    (left) into those of generated (right), given the segments returned from
+    Resources.to_segmented_lines.  Resources are matched up by id, so line-by-line
+    matching is only done within resources that have changed.
+    """
+    opcodes = []
+
+    def add(tag, i1, i2, j1, j2):
+        if i1 == i2 and j1 == j2:
+            return
+        # merge with the previous opcode if it has the same tag
+        if opcodes and opcodes[-1][0] == tag:
+            i1, j1 = opcodes.pop()[1::2]
+        opcodes.append((tag, i1, i2, j1, j2))
+
+    i = j = 0
+    for id in sorted(left_segments.keys() | right_segments.keys()):
+        if id in left_segments:
+            i1, i2 = left_segments[id]
+            if id in right_segments:
+                j1, j2 = right_segments[id]
+                if left[i1:i2] == right[j1:j2]:
+                    add("equal", i1, i2, j1, j2)
+                else:
+                    matcher = difflib.SequenceMatcher(None, left[i1:i2], right[j1:j2])
+                    for tag, a1, a2, b1, b2 in matcher.get_opcodes():
+                        add(tag, i1 + a1, i1 + a2, j1 + b1, j1 + b2)
+                i, j = i2, j2
+            else:
+                add("delete", i1, i2, j, j)
+                i = i2
+        else:
+            j1, j2 = right_segments[id]
+            add("insert", i, i, j1, j2)
+            j = j2
+    return opcodes
+
+
+def group_opcodes(opcodes, n):
+    """
+    Group opcodes into hunks with up to n lines of context, in the same way as
+    difflib.SequenceMatcher.get_grouped_opcodes.  Consecutive opcodes must not
+    have the same tag.
+    """
+    group = []
+    for k, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == "equal":
+            # trim leading context before the first change
+            if k == 0:
+                i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+            # trim trailing context after the last change
+            if k == len(opcodes) - 1:
+                i2, j2 = min(i2, i1 + n), min(j2, j1 + n)
+            # split hunks at long runs of unchanged lines
+            elif i2 - i1 > 2 * n:
+                if group:
+                    group.append((tag, i1, i1 + n, j1, j1 + n))
+                    yield group
+                group = []
+                i1, j1 = i2 - n, j2 - n
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def format_range(start, stop):
+    "Format a range in unified diff format, as difflib does"
+    length = stop - start
+    if length == 1:
+        return "{}".format(start + 1)
+    if not length:
+        return "{},0".format(start)
+    return "{},{}".format(start + 1, length)
+
+
+def unified_diff(left, right, opcodes, n):
+    "Generate the lines of a unified diff of left and right, given their opcodes"
+    for k, group in enumerate(group_opcodes(opcodes, n)):
+        if not k:
+            yield "--- current"
+            yield "+++ generated"
+        first, last = group[0], group[-1]
+        yield "@@ -{} +{} @@".format(
+            format_range(first[1], last[2]), format_range(first[3], last[4])
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in left[i1:i2]:
+                    yield " " + line
+                continue
+            for line in left[i1:i2]:
+                yield "-" + line
+            for line in right[j1:j2]:
+                yield "+" + line
 
 
 diff_options.add(
@@ -71,8 +151,9 @@ diff_options.add(
 def id_diff(generated, current):
     generated_resources = {r.id: r for r in generated}
     current_resources = {r.id: r for r in current}
-    all_resources = sorted(set(generated_resources) | set(current_resources))
+    all_resources = sorted(generated_resources.keys() | current_resources.keys())
     rv = []
+    append = rv.append
     for id in all_resources:
         if id in generated_resources:
             if id in current_resources:
@@ -81,16 +162,18 @@ def id_diff(generated, current):
                 if c == g:
                     continue  # no difference
                 if c.kind == g.kind:
-                    c = attr.asdict(c)
-                    g = attr.asdict(g)
-                    fields = sorted(k for k in c if c[k] != g[k])
+                    fields = sorted(
+                        n
+                        for n in attribute_names(type(g))
+                        if getattr(c, n) != getattr(g, n)
+                    )
                 else:
                     fields = ["kind"]
-                rv.append(t.yellow("! {} (changed: {})".format(id, ", ".join(fields))))
+                append(t.yellow("! {} (changed: {})".format(id, ", ".join(fields))))
             else:
-                rv.append(t.green("+ {}".format(id)))
+                append(t.green("+ {}".format(id)))
         else:
-            rv.append(t.red("- {}".format(id)))
+            append(t.red("- {}".format(id)))
     return "\n".join(rv)
 
 
@@ -99,55 +182,65 @@ def textual_diff(generated, current, context):
     Compare changes from Resources instances geneated and current, returning a
     string.
     """
-    left = str(current).split("\n")
-    right = str(generated).split("\n")
+    left, left_segments = current.to_segmented_lines()
+    right, right_segments = generated.to_segmented_lines()
     resources_start = left.index("resources:")
-    context_re = re.compile(r"^@@ -([0-9]*),")
-    label_re = re.compile(r"^  ([^ ].*)")  # lines with exactly two spaces indentation
+    # line numbers and text of the labels in the resources section
+    label_lines = []
+    labels = []
+    for i in range(resources_start, len(left)):
+        match = LABEL_RE.match(left[i])
+        if match:
+            label_lines.append(i)
+            labels.append(match.group(1))
 
     def contextualize(rangeInfo):
         "add context information to range (@@ .. @@) line"
-        match = context_re.match(rangeInfo)
+        match = CONTEXT_RE.match(rangeInfo)
         if not match:
             return ""
-        line = int(match.group(1))
-        while line > resources_start:
-            line -= 1
-            match = label_re.match(left[line])
-            if match:
-                return match.group(1)
-        return ""
-
-    lines = fast_diff(left, right, context)
-    colors = defaultdict(lambda: lambda s: s)
-    colors = {
-        "-": lambda s: t.red(strip_ansi(s)),
-        "+": lambda s: t.green(strip_ansi(s)),
-        "@": lambda s: t.yellow(strip_ansi(s)) + " " + contextualize(s),
-    }
-    # colorize the lines
-    lines = (
-        colors[l[0]](l).rstrip() for l in (line if line else " " for line in lines)
-    )
-    return "\n".join(lines)
+        # find the last label before the first line of the range
+        idx = bisect.bisect_right(label_lines, int(match.group(1)) - 1) - 1
+        return labels[idx] if idx >= 0 else ""
+
+    # colorize the lines; context lines are passed through unchanged
+    rv = []
+    append = rv.append
+    opcodes = resource_opcodes(left, left_segments, right, right_segments)
+    for line in unified_diff(left, right, opcodes, context):
+        c = line[:1]
+        if c == "-":
+            line = t.red(strip_ansi(line))
+        elif c == "+":
+            line = t.green(strip_ansi(line))
+        elif c == "@":
+            line = t.yellow(strip_ansi(line)) + " " + contextualize(line)
+        append(line.rstrip())
+    return "\n".join(rv)
+
+
+@functools.lru_cache(maxsize=128)
+def compile_grep(pattern):
+    "Compile a --grep pattern, caching the result across calls"
+    return re.compile(pattern)
 
 
 @with_options("ignore_descriptions", "grep", "ids_only", "context")
 def show_diff(generated, current, ignore_descriptions, grep, ids_only, context):
     # limit the resources considered if --grep
     if grep:
+        grep = compile_grep(grep)
         generated = generated.filter(grep)
         current = current.filter(grep)
 
     # reset descriptions to '' if --ignore-descriptions
     if ignore_descriptions:
-        generated = Resources(
-            managed=generated.managed,
-            resources=(r.evolve(description="") for r in generated.resources),
+        # evolving preserves ids, so the results are still sorted and verified
+        generated = Resources._from_sorted(
+            [r.evolve(description="") for r in generated], generated.managed
         )
-        current = Resources(
-            managed=current.managed,
-            resources=(r.evolve(description="") for r in current.resources),
+        current = Resources._from_sorted(
+            [r.evolve(description="") for r in current], current.managed
         )
 
     if ids_only:
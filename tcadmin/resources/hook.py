@@ -61,8 +61,7 @@ class Hook(Resource):
     task = attr.ib(type=dict, metadata={"formatter": json_formatter})
     triggerSchema = attr.ib(type=dict, metadata={"formatter": json_formatter})
 
-    @property
-    def id(self):
+    def _compute_id(self):
         return "{}={}/{}".format(self.kind, self.hookGroupId, self.hookId)
 
     @classmethod
@@ -4,12 +4,11 @@
 # v. 2.0. If a copy of the MPL was not distributed with this file, You can
 # obtain one at http://mozilla.org/MPL/2.0/.
 
+import io
 import re
 import attr
 import blessings
 import functools
-import textwrap
-from sortedcontainers import SortedKeyList
 
 from ..util.matchlist import MatchList
 from ..util.json import pretty_json
@@ -17,6 +16,34 @@ from ..util.json import pretty_json
 t = blessings.Terminal()
 
 
+@functools.lru_cache(maxsize=None)
+def attribute_names(cls):
+    """Return the names of the attributes of the given resource class, in order.
+    The attributes are not known until the class has been decorated, so this is
+    computed on first use rather than when the class is created."""
+    return tuple(a.name for a in attr.fields(cls))
+
+
+def resource_id(resource):
+    "Return the id of a resource, for use as a sort key"
+    return resource.id
+
+
+def default_formatter(id, value):
+    "Format a resource attribute that has no formatter in its metadata"
+    return str(value)
+
+
+def write_indented(write, text, prefix):
+    """Write `text` using `write`, adding `prefix` to each non-blank line.  This
+    is equivalent to `write(textwrap.indent(text, prefix))` without building the
+    indented copy of the string."""
+    for line in text.splitlines(True):
+        if line.strip():
+            write(prefix)
+        write(line)
+
+
 @functools.total_ordering
 @attr.s(slots=True, frozen=True)
 class Resource(object):
@@ -24,13 +51,8 @@ class Resource(object):
     Base class for a single runtime configuration resource
     """
 
-    @classmethod
-    def _kind_classes(cls):
-        try:
-            return cls.__kind_classes
-        except AttributeError:
-            cls.__kind_classes = dict((c.__name__, c) for c in cls.__subclasses__())
-            return cls.__kind_classes
+    # map from kind name to resource class, populated as subclasses are defined
+    _kind_classes = {}
 
     @classmethod
     def from_json(cls, json):
@@ -40,12 +62,12 @@ class Resource(object):
         Note that this modifies the given value in-place
         """
         kind = json.pop("kind")
-        return cls._kind_classes()[kind](**json)
+        return Resource._kind_classes[kind](**json)
 
     def to_json(self):
         "Return a JSON-able version of this object, including a `kind` property"
-        d = attr.asdict(self)
-        d["kind"] = self.kind
+        d = {"kind": self.kind}
+        d.update(attr.asdict(self))
         return d
 
     def to_api(self):
@@ -61,6 +83,12 @@ class Resource(object):
         """
         raise RuntimeError("Cannot merge resources of kind {}".format(self.kind))
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # the kind of an instance is constant for each class
+        cls.kind = cls.__name__
+        Resource._kind_classes[cls.__name__] = cls
+
     @property
     def kind(self):
         "The kind of this instance"
@@ -69,30 +97,56 @@ class Resource(object):
     @property
     def id(self):
         "The id of this instance, including the kind name"
-        return "{}={}".format(
-            self.kind, getattr(self, attr.fields(self.__class__)[0].name)
-        )
+        # resources are immutable, so the id is cached on first use
+        try:
+            return self._id
+        except AttributeError:
+            pass
+        return self._cache("_id", self._compute_id())
+
+    def _compute_id(self):
+        """Compute the id of this instance.  By default this is based on the first
+        attribute; subclasses with a different id format override this method."""
+        return "{}={}".format(self.kind, getattr(self, attribute_names(type(self))[0]))
+
+    def _cache(self, name, value):
+        "Cache a value computed from this (immutable) resource, returning the value"
+        try:
+            object.__setattr__(self, name, value)
+        except AttributeError:
+            pass  # subclass has slots, so there is nowhere to cache
+        return value
 
     def evolve(self, **args):
         "Create a new resource like this one, but with the named attributes replaced"
         return attr.evolve(self, **args)
 
     def __str__(self):
-        rv = ["{t.underline}{id}{t.normal}:".format(t=t, id=self.id)]
+        # resources are immutable, so the rendered form is cached on first use
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        id = self.id
+        buf = io.StringIO()
+        write = buf.write
+        write("{t.underline}{id}{t.normal}:".format(t=t, id=id))
         for a in attr.fields(self.__class__):
-            label = "  {t.bold}{a.name}{t.normal}:".format(t=t, a=a)
-            formatted = a.metadata.get("formatter", lambda id, v: str(v))(
-                self.id, getattr(self, a.name)
+            write("\n  {t.bold}{a.name}{t.normal}:".format(t=t, a=a))
+            formatted = a.metadata.get("formatter", default_formatter)(
+                id, getattr(self, a.name)
             )
             if "\n" in formatted:
-                rv.append(label)
-                rv.append(textwrap.indent(formatted, "    "))
+                write("\n")
+                write_indented(write, formatted, "    ")
             else:
-                rv.append("{} {}".format(label, formatted))
-        return "\n".join(rv)
+                write(" ")
+                write(formatted)
+        rv = buf.getvalue()
+        return self._cache("_str", rv)
 
 
-@attr.s(repr=False)
+@attr.s(repr=False, eq=False)
 class Resources:
     """
     Container class for multiple resource instances.
@@ -101,9 +155,9 @@ class Resources:
     resources that are no longer defined.
     """
 
-    resources = attr.ib(
-        type=SortedKeyList,
-        converter=lambda resources: SortedKeyList(resources, key=lambda r: r.id),
+    _resources = attr.ib(
+        type=list,
+        converter=lambda resources: sorted(resources, key=resource_id),
         default=[],
     )
     managed = attr.ib(
@@ -113,27 +167,39 @@ class Resources:
     )
 
     def __attrs_post_init__(self):
-        self._by_id = {r.id: r for r in self.resources}
-        if len(self._by_id) != len(self.resources):
-            raise RuntimeError("duplicate resources passed to Resources constructor")
+        # duplicates are detected by _verify, below
+        self._by_id = {r.id: r for r in self._resources}
+        self._sorted = True
+        self._verified = False
         self._verify()
 
+    @property
+    def resources(self):
+        "The resources in this collection, sorted by id, as a tuple"
+        return tuple(self._sorted_resources())
+
+    def _sorted_resources(self):
+        "Return the internal list of resources, sorting it first if necessary"
+        # resources added since the list was last sorted are only in _by_id, so
+        # rebuild and sort the list in one pass
+        if not self._sorted:
+            self._resources = sorted(self._by_id.values(), key=resource_id)
+            self._sorted = True
+        return self._resources
+
     def add(self, resource, _skip_verify=False):
         "Add the given resource to the collection"
         if not self.is_managed(resource.id):
             raise RuntimeError("unmanaged resource: " + resource.id)
 
-        # if the resource already exists, try to merge it and remove the
-        # previous version from the list of resources (SortedKeyList does not
-        # support in-place replacement of items)
+        # if the resource already exists, try to merge it
         if resource.id in self._by_id:
-            existing = self._by_id[resource.id]
             resource = self._by_id[resource.id].merge(resource)
-            idx = self.resources.index(existing)
-            del self.resources[idx]
 
+        # the resource is managed, and _by_id cannot contain duplicates, so the
+        # collection remains valid and need not be verified (or sorted) again
         self._by_id[resource.id] = resource
-        self.resources.add(resource)
+        self._sorted = False
 
         if not _skip_verify:
             self._verify()
@@ -149,43 +215,109 @@ class Resources:
     def manage(self, pattern):
         "Add the given pattern to the list of managed resources"
         self.managed.add(pattern)
+        self._verified = False
 
     def filter(self, pattern):
         """Return a new Resources object with only resources matching the given regexp. The
         'manages' property does not change."""
         reg = re.compile(pattern)
-        return Resources(
-            resources=[r for r in self.resources if reg.search(r.id)],
-            managed=self.managed,
+        self._verify()
+        return Resources._from_sorted(
+            [r for r in self._sorted_resources() if reg.search(r.id)], self.managed
         )
 
     def map(self, functor):
         """Call functor for each resource in this collection, returning a new Resources
         containing the result."""
         return Resources(
-            resources=[functor(r) for r in self.resources], managed=self.managed
+            resources=[functor(r) for r in self._sorted_resources()],
+            managed=self.managed,
         )
 
+    @classmethod
+    def _from_sorted(cls, resources, managed):
+        """Create a new Resources object from resources that are already sorted by id
+        and verified (such as a subset of another Resources object), without the
+        sorting and verification done by the constructor."""
+        # construct an empty (trivially sorted and verified) collection normally,
+        # so that every attribute is initialized, then fill in the resources
+        self = cls(managed=managed)
+        self._resources = list(resources)
+        self._by_id = {r.id: r for r in self._resources}
+        return self
+
     def _verify(self):
         "Verify that this set of resources is legal (all managed, no duplicates)"
-
-        unmanaged = sorted([r.id for r in self if not self.is_managed(r.id)])
+        # skip verification if nothing has changed since the last successful check
+        if self._verified:
+            return
+
+        # resources are sorted by id, so duplicates are adjacent and the unmanaged
+        # ids are found in sorted order
+        prev = None
+        duplicates = []
+        unmanaged = []
+        matches = self.managed.matches
+        for r in self._sorted_resources():
+            id = r.id
+            if id == prev:
+                duplicates.append(id)
+            elif not matches(id):
+                unmanaged.append(id)
+            prev = id
+        if duplicates:
+            raise RuntimeError("duplicate resources: " + ", ".join(duplicates))
         if unmanaged:
             raise RuntimeError("unmanaged resources: " + ", ".join(unmanaged))
+        self._verified = True
 
     def is_managed(self, id):
         "Return True if the given id is managed"
         return self.managed.matches(id)
 
     def __iter__(self):
-        return self.resources.__iter__()
+        return iter(self._sorted_resources())
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self._sorted_resources() == other._sorted_resources()
+            and self.managed == other.managed
+        )
 
     def __str__(self):
+        return "\n".join(self.to_lines())
+
+    def to_lines(self):
+        "Return the lines of str(self) as a list"
+        return self.to_segmented_lines()[0]
+
+    def to_segmented_lines(self):
+        """Return the lines of str(self) as a list, along with a dict mapping each
+        resource id to the (start, end) indexes of its lines.  The header (managed
+        patterns) has id "", and each segment includes any blank line separating
+        it from the next."""
         self._verify()
-        return "managed:\n{}\n\nresources:\n{}".format(
-            "\n".join("  - " + m for m in self.managed),
-            textwrap.indent("\n\n".join(str(r) for r in self), "  "),
-        )
+        lines = ["managed:"]
+        append = lines.append
+        for m in self.managed:
+            append("  - " + m)
+        if len(lines) == 1:
+            append("")
+        append("")
+        append("resources:")
+        starts = [("", 0)]
+        for r in self:
+            if len(starts) > 1:
+                append("")
+            starts.append((r.id, len(lines)))
+            for line in str(r).split("\n"):
+                append("  " + line if line.strip() else line)
+        if len(starts) == 1:
+            append("")
+        ends = [start for _, start in starts[1:]] + [len(lines)]
+        return lines, {id: (start, end) for (id, start), end in zip(starts, ends)}
 
     def __repr__(self):
         return pretty_json(self.to_json())
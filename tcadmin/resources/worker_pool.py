@@ -19,8 +19,7 @@ class WorkerPool(Resource):
     emailOnError = attr.ib(type=bool)
     providerId = attr.ib(type=str)
 
-    @property
-    def id(self):
+    def _compute_id(self):
         return "{}={}".format(self.kind, self.workerPoolId)
 
     @classmethod
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public License,
+# v. 2.0. If a copy of the MPL was not distributed with this file, You can
+# obtain one at http://mozilla.org/MPL/2.0/.
+
+import attr
+import textwrap
+
+from tcadmin.diff import textual_diff, id_diff
+from tcadmin.resources.resources import Resource, Resources
+
+
+@attr.s
+class DiffThing(Resource):
+    diffThingId = attr.ib(type=str)
+    value = attr.ib(type=str)
+
+
+def test_textual_diff_no_changes():
+    "Identical resources produce no diff output"
+    current = Resources([DiffThing("a", "1")], [".*"])
+    generated = Resources([DiffThing("a", "1")], [".*"])
+    assert textual_diff(generated, current, 8).strip() == ""
+
+
+def test_textual_diff_changed():
+    "A changed resource produces a unified diff with context labels"
+    current = Resources([DiffThing("a", "1"), DiffThing("b", "1")], [".*"])
+    generated = Resources([DiffThing("a", "1"), DiffThing("b", "2")], [".*"])
+    assert textual_diff(generated, current, 1) == textwrap.dedent(
+        """\
+        --- current
+        +++ generated
+        @@ -10,2 +10,2 @@ DiffThing=b:
+             diffThingId: b
+        -    value: 1
+        +    value: 2"""
+    )
+
+
+def test_textual_diff_added_removed():
+    "Added and removed resources are shown without running a diff over them"
+    current = Resources([DiffThing("a", "1"), DiffThing("b", "1")], [".*"])
+    generated = Resources([DiffThing("b", "1"), DiffThing("c", "1")], [".*"])
+    assert textual_diff(generated, current, 1) == textwrap.dedent(
+        """\
+        --- current
+        +++ generated
+        @@ -4,6 +4,2 @@
+         resources:
+        -  DiffThing=a:
+        -    diffThingId: a
+        -    value: 1
+        -
+           DiffThing=b:
+        @@ -11 +7,5 @@
+             value: 1
+        +
+        +  DiffThing=c:
+        +    diffThingId: c
+        +    value: 1"""
+    )
+
+
+def test_id_diff():
+    "id_diff lists added, removed, and changed resources with changed fields"
+    current = Resources([DiffThing("a", "1"), DiffThing("b", "1")], [".*"])
+    generated = Resources([DiffThing("b", "2"), DiffThing("c", "1")], [".*"])
+    assert id_diff(generated, current).split("\n") == [
+        "- DiffThing=a",
+        "! DiffThing=b (changed: value)",
+        "+ DiffThing=c",
+    ]
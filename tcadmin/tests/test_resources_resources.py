@@ -56,12 +56,31 @@ def test_resource_comparison():
     assert b < c
 
 
+def test_resource_equality_unhashable():
+    "Resources with unhashable attributes compare by value"
+    a = ListThing("lt", ["e1", {"x": 1}])
+    assert a == ListThing("lt", ["e1", {"x": 1}])
+    assert a != ListThing("lt", ["e1", {"x": 2}])
+    with pytest.raises(TypeError):
+        hash(a)
+
+
 def test_resource_to_json():
     "Resources should have a `to_json` method that returns a dict"
     a = Thing("a", "V")
     assert a.to_json() == dict(kind="Thing", thingId="a", value="V")
 
 
+def test_resource_to_json_copy():
+    "Modifying the result of `to_json` does not affect later calls"
+    a = ListThing("lt", [{"k": [1]}])
+    a.to_json().pop("kind")
+    a.to_json()["things"][0]["k"].append(2)
+    assert a.to_json() == dict(
+        kind="ListThing", listThingId="lt", things=[{"k": [1]}]
+    )
+
+
 def test_resource_from_json():
     "Resource classes should have a `from_json` method that takes dict and creates an object"
     a = Resource.from_json({"kind": "Thing", "thingId": "a", "value": "V"})
@@ -69,6 +88,18 @@ def test_resource_from_json():
     assert a.value == "V"
 
 
+def test_resource_from_json_late_subclass():
+    "Resource kinds defined after from_json has been called are still found"
+    Resource.from_json({"kind": "Thing", "thingId": "a", "value": "V"})
+
+    @attr.s
+    class LateThing(Resource):
+        lateThingId = attr.ib(type=str)
+
+    a = Resource.from_json({"kind": "LateThing", "lateThingId": "a"})
+    assert a == LateThing("a")
+
+
 def test_resource_kind():
     "Resources should have an `kind` attribute naming the calss"
     a = Thing("a", "V")
@@ -134,12 +165,34 @@ def test_resource_formatter():
     )
 
 
+def test_resource_str_cached():
+    "String formatting is cached, and evolved resources are rendered afresh"
+    a = Thing("a", "V")
+    assert str(a) is str(a)
+    assert str(a.evolve(value="W")).endswith("value: W")
+
+
 def test_resources_sorted():
     "Resources are always sorted"
     coll = Resources([Thing("z", "3"), Thing("x", "1"), Thing("y", "2")], ["Thing=*"])
     assert [r.thingId for r in coll] == ["x", "y", "z"]
 
 
+def test_resources_sorted_after_add():
+    "Resources added after construction are sorted"
+    coll = Resources([Thing("y", "2")], ["Thing=*"])
+    coll.update([Thing("z", "3"), Thing("x", "1")])
+    assert [r.thingId for r in coll] == ["x", "y", "z"]
+    assert [r.thingId for r in coll.resources] == ["x", "y", "z"]
+
+
+def test_resources_resources_immutable():
+    "The `resources` property cannot be used to modify the collection"
+    coll = Resources([Thing("x", "1")], ["Thing=*"])
+    with pytest.raises(AttributeError):
+        coll.resources.append(Thing("y", "2"))
+
+
 def test_resources_filter():
     coll = Resources(
         [Thing("abc", "3"), Thing("abd", "1"), Thing("dbc", "2")], ["Thing=*"]
@@ -218,6 +271,13 @@ def test_resources_verify_duplicates_prohibited():
     assert "Cannot merge resources of kind Thing" in str(exc.value)
 
 
+def test_resources_verify_duplicates_named():
+    "Duplicate resources are reported by id"
+    with pytest.raises(RuntimeError) as exc:
+        Resources([Thing("x", "1"), Thing("y", "1"), Thing("x", "2")], [".*"])
+    assert "duplicate resources: Thing=x" in str(exc.value)
+
+
 def test_resources_verify_unmanaged_prohibited():
     "Duplicate resources are not allowed"
     with pytest.raises(RuntimeError) as exc:
@@ -225,6 +285,18 @@ def test_resources_verify_unmanaged_prohibited():
     assert "unmanaged resources: ListThing=y" in str(exc.value)
 
 
+def test_resources_str_after_add():
+    "Resources added after the collection was stringified are included"
+    rsrcs = Resources([Thing("y", "1")], ["Thing=*"])
+    str(rsrcs)
+    rsrcs.add(Thing("x", "1"))
+    assert str(rsrcs).split("\n")[4:7] == [
+        "  Thing=x:",
+        "    thingId: x",
+        "    value: 1",
+    ]
+
+
 def test_resources_str():
     "Resources are stringified in order"
     resources = Resources(
@@ -247,6 +319,41 @@ def test_resources_str():
     )
 
 
+def test_resources_to_lines():
+    "Resources.to_lines returns the lines of the string form"
+    resources = Resources([Thing("x", "1"), ListThing("y", ["a", "b"])], [".*"])
+    assert resources.to_lines() == str(resources).split("\n")
+    assert resources.to_lines()[3:9] == [
+        "resources:",
+        "  ListThing=y:",
+        "    listThingId: y",
+        "    things:",
+        "      - a",
+        "      - b",
+    ]
+
+
+def test_resources_to_segmented_lines():
+    "Resources.to_segmented_lines gives the line range of each resource"
+    resources = Resources([Thing("x", "1"), ListThing("y", ["a", "b"])], [".*"])
+    lines, segments = resources.to_segmented_lines()
+    assert segments == {"": (0, 4), "ListThing=y": (4, 10), "Thing=x": (10, 13)}
+    assert lines[4:10] == [
+        "  ListThing=y:",
+        "    listThingId: y",
+        "    things:",
+        "      - a",
+        "      - b",
+        "",
+    ]
+
+
+def test_resources_to_lines_empty():
+    "Resources.to_lines handles empty collections"
+    resources = Resources([], [])
+    assert resources.to_lines() == ["managed:", "", "", "resources:", ""]
+
+
 def test_resources_repr():
     "Resources repr is pretty JSON"
     resources = Resources([Thing("x", "1"), Thing("y", "1")], [".*"])
@@ -28,3 +28,34 @@ def test_MatchList_match_rooted():
     ml = MatchList(["ab+"])
     assert ml.matches("abc")
     assert not ml.matches("xabc")
+
+
+def test_MatchList_add():
+    ml = MatchList(["a"])
+    assert not ml.matches("b")
+    ml.add("b")
+    assert ml.matches("b")
+
+
+def test_MatchList_empty():
+    ml = MatchList([])
+    assert not ml.matches("")
+
+
+def test_MatchList_backreference():
+    ml = MatchList(["x", "(a)b\\1$"])
+    assert ml.matches("aba")
+    assert not ml.matches("abx")
+
+
+def test_MatchList_conditional_group():
+    ml = MatchList(["(x)y", "(a)?(?(1)b|c)$"])
+    assert ml.matches("ab")
+    assert ml.matches("c")
+    assert not ml.matches("ac")
+
+
+def test_MatchList_flags():
+    ml = MatchList(["x", "(?i)abc"])
+    assert ml.matches("ABC")
+    assert not ml.matches("X")
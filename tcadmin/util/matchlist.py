@@ -12,6 +12,26 @@ def make_regular_expressions(patterns):
     return [re.compile(p) for p in patterns]
 
 
+# patterns containing backreferences, conditional group references, or
+# non-default flags cannot safely be combined into a single alternation; this
+# errs on the side of caution
+UNCOMBINABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+DEFAULT_FLAGS = re.compile("").flags
+
+
+def combine_regular_expressions(patterns):
+    """Combine compiled patterns into a single regular expression matching any of
+    them, or return None if that is not possible"""
+    for p in patterns:
+        if p.flags != DEFAULT_FLAGS or UNCOMBINABLE.search(p.pattern):
+            return None
+    try:
+        return re.compile("|".join("(?:{})".format(p.pattern) for p in patterns))
+    except re.error:
+        # for example, the same group name used in two patterns
+        return None
+
+
 @attr.s
 class MatchList:
     """
@@ -21,14 +41,23 @@ class MatchList:
     """
 
     _patterns = attr.ib(type=list, converter=make_regular_expressions)
+    # the patterns combined into one regular expression, built on demand
+    _combined = attr.ib(init=False, default=None, eq=False, repr=False)
 
     def add(self, expr):
         "Add `expr` to the set of patterns"
         self._patterns.append(re.compile(expr))
+        self._combined = None
 
     def __iter__(self):
         return (p.pattern for p in self._patterns)
 
     def matches(self, item):
         "Return True if this item is matched by one of the patterns in the list"
+        if not self._patterns:
+            return False
+        if self._combined is None:
+            self._combined = combine_regular_expressions(self._patterns) or False
+        if self._combined:
+            return self._combined.match(item) is not None
         return any(pat.match(item) for pat in self._patterns)